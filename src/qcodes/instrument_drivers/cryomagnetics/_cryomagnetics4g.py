@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import bisect
 import re
 import time
 from dataclasses import dataclass
-from typing import TYPE_CHECKING
+from types import MappingProxyType
+from typing import TYPE_CHECKING, TypeVar
 
 from pyvisa import VisaIOError
 
@@ -11,12 +13,33 @@ from qcodes.instrument import VisaInstrument, VisaInstrumentKWArgs
 from qcodes.validators import Enum, Numbers
 
 if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping
+
     from typing_extensions import Unpack
 
     from qcodes.parameters import Parameter
 
+T = TypeVar("T")
+
+# Matches a field reading such as "85.0 kG"; compiled once at import
+_FIELD_RE = re.compile(r"^([-+]?[0-9]*\.?[0-9]+)\s*([a-zA-Z]+)$")
+# Matches a reading with an optional trailing unit such as "4.75V" or "4.75"
+_NUMERIC_RE = re.compile(r"([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*[a-zA-Z]*")
+
+
+def _parse_unit_suffixed_float(value: str) -> float:
+    """
+    Parse a reading such as "4.75V" or "85.0A" into a float, discarding
+    the unit suffix appended by the instrument. Bare numbers, as returned
+    by some firmware versions, are accepted as well.
+    """
+    match = _NUMERIC_RE.fullmatch(value.strip())
+    if not match:
+        raise ValueError(f"Invalid format for measurement: '{value}'")
+    return float(match.group(1))
+
 
-@dataclass
+@dataclass(slots=True)
 class CryomagneticsOperatingState:
     ramping: bool = False
     holding: bool = False
@@ -25,12 +48,9 @@ class CryomagneticsOperatingState:
     power_module_failure: bool = False
 
     def can_start_ramping(self) -> bool:
-        required_checks = [
-            "ramping",
-            "quench_condition_present",
-            "power_module_failure",
-        ]
-        return all(not getattr(self, field) for field in required_checks)
+        return not (
+            self.ramping or self.quench_condition_present or self.power_module_failure
+        )
 
 
 class Cryomagnetics4GException(Exception):
@@ -60,6 +80,24 @@ class CryomagneticsModel4G(VisaInstrument):
     """
 
     KG_TO_TESLA: float = 0.1  # Constant for unit conversion
+    # Format spec for numeric command arguments, which keeps messages short
+    # compared to the full float repr
+    _NUMBER_FORMAT: str = ".6g"
+    # While waiting for a ramp to finish the status byte is first polled every
+    # ramping_state_check_interval seconds, backing off to at most this interval
+    _MAX_RAMPING_STATE_CHECK_INTERVAL: float = 5.0
+    # Lower bound on the first poll interval so that an interval of 0 still
+    # backs off instead of polling without pause
+    _MIN_RAMPING_STATE_CHECK_INTERVAL: float = 0.01
+    _RAMPING_STATE_CHECK_BACKOFF: float = 1.5
+    # Whether a write or ask that failed with a VisaIOError is retried
+    _RETRY_WRITE_ASK: bool = True
+    # Delays in seconds before each retry of a write or ask that failed
+    # with a VisaIOError
+    _RETRY_DELAYS: tuple[float, ...] = (0.05, 0.2, 1.0, 5.0)
+    # Time in seconds for which the last field reading is reused when
+    # selecting the range for a new ramp rate
+    _FIELD_CACHE_LIFETIME: float = 0.2
 
     default_terminator = "\n"
 
@@ -72,14 +110,17 @@ class CryomagneticsModel4G(VisaInstrument):
         **kwargs: Unpack[VisaInstrumentKWArgs],
     ):
         super().__init__(name, address, **kwargs)
+        # The backend only changes through set_address, so resolve once
+        # here rather than on every call to _sleep
+        self._simmode = self.visabackend == "sim"
+        # Last field reading in kG and the time.monotonic() at which it was taken
+        self._last_field_kg: tuple[float, float] | None = None
 
         self.coil_constant = coil_constant
+        # Initialize rate manager based on hypothetical hardware specific limits.
+        # Assigning the limits also sends them to the instrument.
         self.max_current_limits = max_current_limits
 
-        # Initialize  rate manager based on hypothetical hardware specific limits
-        # Initialize rate manager based on hypothetical hardware specific limits
-        self._initialize_max_current_limits()
-
         # Adding parameters
         self.units: Parameter = self.add_parameter(
             name="units",
@@ -125,7 +166,7 @@ class CryomagneticsModel4G(VisaInstrument):
             name="Vmag",
             unit="V",
             get_cmd="VMAG?",
-            get_parser=float,
+            get_parser=_parse_unit_suffixed_float,
             vals=Numbers(-10, 10),
             docstring="Magnet sense voltage",
         )
@@ -135,7 +176,7 @@ class CryomagneticsModel4G(VisaInstrument):
             name="Vout",
             unit="V",
             get_cmd="VOUT?",
-            get_parser=float,
+            get_parser=_parse_unit_suffixed_float,
             vals=Numbers(-12.8, 12.8),
             docstring="Magnet output voltage",
         )
@@ -145,17 +186,47 @@ class CryomagneticsModel4G(VisaInstrument):
             name="Iout",
             unit="A",
             get_cmd="IOUT?",
-            get_parser=float,
+            get_parser=_parse_unit_suffixed_float,
             docstring="Magnet output field/current",
         )
         """Magnet output field/current"""
 
-        # Set to remote mode
+        # Set to remote mode. The 4G has no query for the operating mode,
+        # so this is always written.
         self.operating_mode()
         #  Set units to tesla by default
-        self.units("T")
+        # Reading the units first fills the parameter cache, and the write is
+        # skipped if they are already tesla, e.g. when reconnecting.
+        if self.units() != "T":
+            self.units("T")
         self.connect_message()
 
+    @property
+    def max_current_limits(self) -> Mapping[int, tuple[float, float]]:
+        """
+        The upper current limit and maximum rate of each range, keyed by
+        range index. The returned mapping is read-only; assign a new
+        dictionary to change the limits. Doing so sends the new RANGE and
+        RATE settings to the instrument and rebuilds the lookup table used
+        to find the range of a given current.
+        """
+        return MappingProxyType(self._max_current_limits)
+
+    @max_current_limits.setter
+    def max_current_limits(self, limits: Mapping[int, tuple[float, float]]) -> None:
+        # Copy so that later changes to the caller's dict cannot bypass
+        # the lookup table below
+        self._max_current_limits = dict(limits)
+        # Ranges sorted by upper limit so the range of a current can be
+        # found by bisection
+        self._sorted_current_limits = sorted(
+            limits.items(), key=lambda item: item[1][0]
+        )
+        self._upper_current_limits = [
+            upper_limit for _, (upper_limit, _) in self._sorted_current_limits
+        ]
+        self._initialize_max_current_limits()
+
     def quenched_state_reset(self) -> None:
         """
         Resets the device's quenched state.
@@ -179,12 +250,38 @@ class CryomagneticsModel4G(VisaInstrument):
         Sets the device current to zero.
         """
         self.write("SWEEP ZERO")
+        # The field is about to change so the last reading is stale
+        self._last_field_kg = None
+
+    def get_voltages_and_current(self) -> tuple[float, float, float]:
+        """
+        Reads the magnet sense voltage, output voltage and output current
+        in a single compound query and updates the caches of the ``Vmag``,
+        ``Vout`` and ``Iout`` parameters accordingly.
+
+        Returns:
+            A tuple of (Vmag, Vout, Iout) in V, V and A.
+        """
+        response = self.ask("VMAG?;VOUT?;IOUT?")
+        parts = response.split(";")
+        if len(parts) != 3:
+            raise ValueError(f"Invalid format for measurement: '{response}'")
+        vmag, vout, iout = (_parse_unit_suffixed_float(part) for part in parts)
+
+        self.Vmag.cache.set(vmag)
+        self.Vout.cache.set(vout)
+        self.Iout.cache.set(iout)
+        return vmag, vout, iout
 
     def reset(self) -> None:
         """
         Resets the device to its default settings.
         """
         self.write("*RST")
+        # The reset may change the units behind the cached value and the
+        # field may change, so neither cached value can be trusted
+        self.units.cache.invalidate()
+        self._last_field_kg = None
 
     def magnet_operating_state(self) -> CryomagneticsOperatingState:
         """
@@ -214,30 +311,20 @@ class CryomagneticsModel4G(VisaInstrument):
         """
         status_byte = int(self.ask("*STB?"))
 
-        operating_state = CryomagneticsOperatingState(
-            holding=not bool(status_byte & 1) and not bool(status_byte & 2),
-            ramping=bool(status_byte & 1),
-            standby=bool(status_byte & 2),
-            quench_condition_present=bool(status_byte & 4),
-            power_module_failure=bool(status_byte & 8),
-        )
-
-        if operating_state.quench_condition_present:
-            error_message = "Cannot ramp due to quench condition."
-            self.log.error(error_message)  # Log the error message
-            raise Cryomagnetics4GException(error_message)
-
-        if operating_state.power_module_failure:
-            error_message = "Cannot ramp due to power module failure."
-            self.log.error(error_message)  # Log the error message
-            raise Cryomagnetics4GException(error_message)
-
-        if operating_state.ramping:
-            error_message = "Cannot ramp as the power supply is already ramping."
+        # Ramping (1), quench (4) and power module failure (8) all prevent
+        # ramping, so test them in one go before working out which is set
+        if status_byte & 0b1101:
+            if status_byte & 4:
+                error_message = "Cannot ramp due to quench condition."
+            elif status_byte & 8:
+                error_message = "Cannot ramp due to power module failure."
+            else:
+                error_message = "Cannot ramp as the power supply is already ramping."
             self.log.error(error_message)  # Log the error message
             raise Cryomagnetics4GException(error_message)
 
-        return operating_state
+        standby = bool(status_byte & 2)
+        return CryomagneticsOperatingState(holding=not standby, standby=standby)
 
     def set_field(self, field_setpoint: float, block: bool = True) -> None:
         """
@@ -252,8 +339,10 @@ class CryomagneticsModel4G(VisaInstrument):
         """
         # Convert field setpoint to kG for the instrument
         field_setpoint_kg = field_setpoint * 10
-        # Determine sweep direction based on setpoint and current field
-        current_field = self._get_field()
+        # Determine sweep direction based on setpoint and current field.
+        # The field is read once in kG, the unit of the sweep limits, so
+        # that no conversion is needed for the comparisons below.
+        current_field = self._get_field_kg()
 
         self.log.debug(f"Current field: {current_field}, Setpoint: {field_setpoint_kg}")
 
@@ -272,14 +361,16 @@ class CryomagneticsModel4G(VisaInstrument):
         if state.can_start_ramping():
             if field_setpoint_kg < current_field:
                 sweep_direction = "DOWN"
-                self.write(f"LLIM {field_setpoint_kg}")
+                self.write(f"LLIM {field_setpoint_kg:{self._NUMBER_FORMAT}}")
             else:
                 sweep_direction = "UP"
-                self.write(f"ULIM {field_setpoint_kg}")
+                self.write(f"ULIM {field_setpoint_kg:{self._NUMBER_FORMAT}}")
 
             self.log.debug(f"Sweeping {sweep_direction} to {field_setpoint_kg}")
 
             self.write(f"SWEEP {sweep_direction}")
+            # The field is about to change so the last reading is stale
+            self._last_field_kg = None
 
             # Check if we want to block
             if not block:
@@ -301,12 +392,26 @@ class CryomagneticsModel4G(VisaInstrument):
     def wait_while_ramping(
         self, value: float, threshold: float = 1e-5
     ) -> CryomagneticsOperatingState:
-        """Waits while the magnet is ramping, checking the status byte instead of field value."""
+        """
+        Waits while the magnet is ramping, checking the status byte instead of field value.
+
+        The status byte is polled every ``ramping_state_check_interval`` seconds
+        to begin with so that short ramps return promptly. The interval then
+        grows geometrically up to ``_MAX_RAMPING_STATE_CHECK_INTERVAL`` so that
+        long ramps do not flood the instrument with queries. An initial interval
+        above that cap is used unchanged, and one below
+        ``_MIN_RAMPING_STATE_CHECK_INTERVAL`` is raised to that floor.
+        """
+        interval = max(
+            self.ramping_state_check_interval(), self._MIN_RAMPING_STATE_CHECK_INTERVAL
+        )
+        max_interval = max(self._MAX_RAMPING_STATE_CHECK_INTERVAL, interval)
         while True:
             status_byte = int(self.ask("*STB?"))
             if not bool(status_byte & 1):  # Check if ramping bit is clear
                 break
-            self._sleep(self.ramping_state_check_interval())
+            self._sleep(interval)
+            interval = min(interval * self._RAMPING_STATE_CHECK_BACKOFF, max_interval)
         self.write("SWEEP PAUSE")
         self._sleep(1.0)
         return self.magnet_operating_state()
@@ -316,20 +421,40 @@ class CryomagneticsModel4G(VisaInstrument):
         Sleep for a number of seconds t. If we are or using
         the PyVISA 'sim' backend, omit this
         """
+        if not self._simmode:
+            time.sleep(t)
 
-        simmode = getattr(self, "visabackend", False) == "sim"
+    def set_address(self, address: str) -> None:
+        super().set_address(address)
+        self._simmode = self.visabackend == "sim"
+        self._last_field_kg = None
+        self.units.cache.invalidate()
 
-        if simmode:
-            return
+    def _get_field(self) -> float:
+        numeric_value = self._get_field_kg()
+
+        # The units are only changed through the units parameter so the
+        # cached value is used rather than querying the instrument again.
+        # reset and set_address invalidate the cache so it is re-read then.
+        units = self.units.cache.get()
+        if units == "A":
+            raise ValueError(
+                "Current units are set to Amperes (A). Cannot retrieve magnetic field in these units."
+            )
+
+        # Return value in Tesla, only converting if necessary
+        if units == "T":
+            return numeric_value * self.KG_TO_TESLA
         else:
-            time.sleep(t)
+            return numeric_value
 
-    def _get_field(self) -> float:
+    def _get_field_kg(self) -> float:
+        """
+        Get the magnet field in kG as reported by the instrument, without
+        any unit conversion.
+        """
         current_value = self.ask("IMAG?")
-        # Define a regular expression to match the floating point number and the unit
-        match = re.match(
-            r"^([-+]?[0-9]*\.?[0-9]+)\s*([a-zA-Z]+)$", current_value.strip()
-        )
+        match = _FIELD_RE.match(current_value.strip())
 
         if not match:
             raise ValueError(f"Invalid format for measurement: '{current_value}'")
@@ -345,16 +470,8 @@ class CryomagneticsModel4G(VisaInstrument):
         # Validate the unit part
         if unit != "kG":
             raise ValueError(f"Unexpected unit '{unit}'. Expected 'kG'")
-        if self.units() == "A":
-            raise ValueError(
-                "Current units are set to Amperes (A). Cannot retrieve magnetic field in these units."
-            )
-
-        # Return value in Tesla, only converting if necessary
-        if self.units() == "T":
-            return numeric_value * self.KG_TO_TESLA
-        else:
-            return numeric_value
+        self._last_field_kg = (numeric_value, time.monotonic())
+        return numeric_value
 
     def _get_rate(self) -> float:
         """
@@ -363,7 +480,7 @@ class CryomagneticsModel4G(VisaInstrument):
         # Get the rate from the instrument in Amps per second
         rate_amps_per_sec = float(self.ask("RATE?"))
         # Convert to Tesla per minute
-        rate_tesla_per_min = rate_amps_per_sec * 60 / self.coil_constant
+        rate_tesla_per_min = rate_amps_per_sec * self.coil_constant * 60
         return rate_tesla_per_min
 
     def _set_rate(self, rate_tesla_per_min: float) -> None:
@@ -371,63 +488,82 @@ class CryomagneticsModel4G(VisaInstrument):
         Set the ramp rate in Tesla per minute.
         """
         # Convert from Tesla per minute to Amps per second
-        rate_amps_per_sec = rate_tesla_per_min * self.coil_constant / 60
-        # Find the appropriate range and set the rate
-        current_field = self._get_field()  # Get current field in Tesla
-        current_in_amps = current_field * self.coil_constant  # Convert to Amps
-
-        # (Implement a  more efficient lookup method here if needed)
-        for range_index, (upper_limit, max_rate) in self.max_current_limits.items():
-            if current_in_amps <= upper_limit:
-                actual_rate = min(
-                    rate_amps_per_sec, max_rate
-                )  # Ensure rate doesn't exceed maximum
-                self.write(f"RATE {range_index} {actual_rate}")
-                return
+        rate_amps_per_sec = rate_tesla_per_min / self.coil_constant / 60
+        # Find the appropriate range and set the rate. The range only depends
+        # on the present field, so a very recent reading is reused rather than
+        # querying the instrument again.
+        if (
+            self._last_field_kg is not None
+            and time.monotonic() - self._last_field_kg[1] < self._FIELD_CACHE_LIFETIME
+        ):
+            current_field_kg = self._last_field_kg[0]
+        else:
+            current_field_kg = self._get_field_kg()
+        current_field = current_field_kg * self.KG_TO_TESLA  # Convert to Tesla
+        current_in_amps = current_field / self.coil_constant  # Convert to Amps
+
+        # Find the range with the smallest upper limit above the magnitude of
+        # the current; the ranges apply to both polarities
+        index = bisect.bisect_left(self._upper_current_limits, abs(current_in_amps))
+        if index == len(self._upper_current_limits):
+            available_ranges = ", ".join(
+                f"{upper_limit}A" for upper_limit in self._upper_current_limits
+            )
+            raise ValueError(
+                f"Current field is outside of defined rate ranges: "
+                f"{current_in_amps}A exceeds the available upper limits "
+                f"({available_ranges})"
+            )
 
-        raise ValueError("Current field is outside of defined rate ranges")
+        range_index, (_, max_rate) = self._sorted_current_limits[index]
+        actual_rate = min(
+            rate_amps_per_sec, max_rate
+        )  # Ensure rate doesn't exceed maximum
+        self.write(f"RATE {range_index} {actual_rate:{self._NUMBER_FORMAT}}")
 
     def _initialize_max_current_limits(self) -> None:
         """
         Initialize the instrument with the provided current limits and rates.
+
+        All RANGE and RATE commands are chained with semicolons and sent in a
+        single write to avoid a round trip per command.
         """
-        for range_index, (upper_limit, max_rate) in self.max_current_limits.items():
-            self.write(f"RANGE {range_index} {upper_limit}")
-            self.write(f"RATE {range_index} {max_rate}")
+        commands = ";".join(
+            f"RANGE {range_index} {upper_limit:{self._NUMBER_FORMAT}};"
+            f"RATE {range_index} {max_rate:{self._NUMBER_FORMAT}}"
+            for range_index, (upper_limit, max_rate) in self.max_current_limits.items()
+        )
+        if commands:
+            self.write(commands)
 
     def write_raw(self, cmd: str) -> None:
-
-        try:
-            super().write_raw(cmd)
-        except VisaIOError as err:
-            # The ami communication has found to be unstable
-            # so we retry the communication here
-            msg = f"Got VisaIOError while writing {cmd} to instrument."
-            if self._RETRY_WRITE_ASK:
-                msg += f" Will retry in {self._RETRY_TIME} sec."
-            self.log.exception(msg)
-            if self._RETRY_WRITE_ASK:
-                time.sleep(self._RETRY_TIME)
-                self.device_clear()
-                super().write_raw(cmd)
-            else:
-                raise err
+        self._retry_on_visa_error(
+            super().write_raw,
+            cmd,
+            f"Got VisaIOError while writing {cmd} to instrument.",
+        )
 
     def ask_raw(self, cmd: str) -> str:
+        return self._retry_on_visa_error(
+            super().ask_raw,
+            cmd,
+            f"Got VisaIOError while asking the instrument: {cmd}",
+        )
 
-        try:
-            result = super().ask_raw(cmd)
-        except VisaIOError as err:
-            # The communication has found to be unstable
-            # so we retry the communication here
-            msg = f"Got VisaIOError while asking the instrument: {cmd}"
-            if self._RETRY_WRITE_ASK:
-                msg += f" Will retry in {self._RETRY_TIME} sec."
-            self.log.exception(msg)
-            if self._RETRY_WRITE_ASK:
-                time.sleep(self._RETRY_TIME)
-                self.device_clear()
-                result = super().ask_raw(cmd)
-            else:
-                raise err
-        return result
+    def _retry_on_visa_error(self, func: Callable[[str], T], cmd: str, msg: str) -> T:
+        """
+        Call ``func(cmd)``, retrying after each delay in ``_RETRY_DELAYS``
+        if it raises a VisaIOError. The communication has been found to be
+        unstable, but most failures are transient, so the first retries
+        happen quickly and the delay only grows if the errors persist.
+        The error of the final attempt is raised to the caller.
+        """
+        delays = self._RETRY_DELAYS if self._RETRY_WRITE_ASK else ()
+        for delay in delays:
+            try:
+                return func(cmd)
+            except VisaIOError:
+                self.log.exception(f"{msg} Will retry in {delay} sec.")
+            time.sleep(delay)
+            self.device_clear()
+        return func(cmd)
@@ -1,8 +1,12 @@
 import logging
-from unittest.mock import MagicMock, Mock, call, patch
+import time
+from unittest.mock import Mock, call, patch
 
 import pytest
+from pyvisa import VisaIOError
+from pyvisa.constants import StatusCode
 
+from qcodes.instrument import VisaInstrument
 from qcodes.instrument_drivers.cryomagnetics import (
     Cryomagnetics4GException,
     CryomagneticsModel4G,
@@ -32,10 +36,136 @@ def test_initialization(cryo_instrument):
     # assert cryo_instrument.terminator == "\n"
 
 
+@pytest.mark.parametrize(
+    "initial_units, expect_units_write", [("T", False), ("kG", True)]
+)
+def test_initialization_sets_units_only_if_needed(initial_units, expect_units_write):
+    responses = {"*IDN?": "Cryomagnetics,4G,2239,1.02,208", "UNITS?": initial_units}
+    with (
+        patch.object(
+            CryomagneticsModel4G,
+            "ask_raw",
+            side_effect=lambda cmd: responses.get(cmd, ""),
+        ),
+        patch.object(CryomagneticsModel4G, "write_raw") as mock_write_raw,
+    ):
+        instrument = CryomagneticsModel4G(
+            "test_cryo_4g_units",
+            "GPIB::1::INSTR",
+            max_current_limits={0: (0.0, 0.0)},
+            coil_constant=10.0,
+            pyvisa_sim_file="cryo4g.yaml",
+        )
+    try:
+        assert (call("UNITS T") in mock_write_raw.call_args_list) is expect_units_write
+        assert call("REMOTE") in mock_write_raw.call_args_list
+        assert instrument.units.cache.get(get_if_invalid=False) == "T"
+    finally:
+        instrument.close()
+
+
 def test_get_field(cryo_instrument):
-    cryo_instrument.units = MagicMock(return_value="T")
-    with patch.object(cryo_instrument, "ask", return_value="50.0 kG"):
+    cryo_instrument.units("T")
+    with patch.object(cryo_instrument, "ask", return_value="50.0 kG") as mock_ask:
         assert cryo_instrument.field() == 5.0
+    # the units are taken from the parameter cache, not queried
+    assert mock_ask.call_args_list == [call("IMAG?")]
+
+
+def test_reset_invalidates_units(cryo_instrument):
+    cryo_instrument.units("T")
+    with patch.object(cryo_instrument, "write"):
+        cryo_instrument.reset()
+    assert not cryo_instrument.units.cache.valid
+
+    with patch.object(cryo_instrument, "ask", return_value="50.0 kG"):
+        with patch.object(cryo_instrument, "ask_raw", return_value="kG") as mock_raw:
+            assert cryo_instrument.field() == 50.0
+    mock_raw.assert_called_once_with("UNITS?")
+
+
+def test_set_address_invalidates_units(cryo_instrument):
+    cryo_instrument.units("T")
+    cryo_instrument.set_address(cryo_instrument._address)
+    assert not cryo_instrument.units.cache.valid
+
+
+def test_get_field_kg_ignores_units(cryo_instrument):
+    cryo_instrument.units("A")
+    with patch.object(cryo_instrument, "ask", return_value="50.0 kG"):
+        assert cryo_instrument._get_field_kg() == 50.0
+
+
+def test_get_field_kg_unexpected_unit(cryo_instrument):
+    with (
+        patch.object(cryo_instrument, "ask", return_value="5.0 T"),
+        pytest.raises(ValueError, match="Unexpected unit 'T'"),
+    ):
+        cryo_instrument._get_field_kg()
+
+
+def test_get_field_units_kg(cryo_instrument):
+    cryo_instrument.units("kG")
+    with patch.object(cryo_instrument, "ask", return_value="50.0 kG"):
+        assert cryo_instrument.field() == 50.0
+
+
+def test_get_field_units_amps(cryo_instrument):
+    cryo_instrument.units("A")
+    with (
+        patch.object(cryo_instrument, "ask", return_value="50.0 kG"),
+        pytest.raises(ValueError, match="Current units are set to Amperes"),
+    ):
+        cryo_instrument.field()
+
+
+@pytest.mark.parametrize(
+    "param_name, response, expected",
+    [
+        ("Vmag", "4.75V", 4.75),
+        ("Vout", "-12.0V", -12.0),
+        ("Iout", "85.0A", 85.0),
+        ("Iout", "1.5e-3A", 1.5e-3),
+        ("Vmag", "4.75", 4.75),
+        ("Iout", " -85.0\r", -85.0),
+    ],
+)
+def test_get_unit_suffixed_readings(cryo_instrument, param_name, response, expected):
+    with patch.object(cryo_instrument, "ask_raw", return_value=response):
+        assert getattr(cryo_instrument, param_name)() == expected
+
+
+@pytest.mark.parametrize("response", ["ERROR", "1.2.3V", "4.75V extra", ""])
+def test_get_unit_suffixed_readings_invalid(cryo_instrument, response):
+    with (
+        patch.object(cryo_instrument, "ask_raw", return_value=response),
+        pytest.raises(ValueError, match="Invalid format for measurement"),
+    ):
+        cryo_instrument.Vmag()
+
+
+def test_get_voltages_and_current(cryo_instrument):
+    with patch.object(cryo_instrument, "ask", return_value="4.75;12.0;85.0"):
+        assert cryo_instrument.get_voltages_and_current() == (4.75, 12.0, 85.0)
+    assert cryo_instrument.Vmag.cache.get(get_if_invalid=False) == 4.75
+    assert cryo_instrument.Vout.cache.get(get_if_invalid=False) == 12.0
+    assert cryo_instrument.Iout.cache.get(get_if_invalid=False) == 85.0
+
+
+def test_get_voltages_and_current_unit_suffixed(cryo_instrument):
+    with patch.object(
+        cryo_instrument, "ask", return_value="4.75V;-12.0V;85.0A"
+    ) as mock_ask:
+        assert cryo_instrument.get_voltages_and_current() == (4.75, -12.0, 85.0)
+    mock_ask.assert_called_once_with("VMAG?;VOUT?;IOUT?")
+
+
+def test_get_voltages_and_current_invalid(cryo_instrument):
+    with (
+        patch.object(cryo_instrument, "ask", return_value="4.75V;-12.0V"),
+        pytest.raises(ValueError, match="Invalid format for measurement"),
+    ):
+        cryo_instrument.get_voltages_and_current()
 
 
 def test_initialization_visa_sim(cryo_instrument):
@@ -62,6 +192,14 @@ def test_initialization_visa_sim(cryo_instrument):
             Cryomagnetics4GException,
             "Cannot ramp due to power module failure.",
         ),
+        ("5", None, Cryomagnetics4GException, "Cannot ramp due to quench condition."),
+        (
+            "9",
+            None,
+            Cryomagnetics4GException,
+            "Cannot ramp due to power module failure.",
+        ),
+        ("16", CryomagneticsOperatingState(holding=True), None, None),
     ],
 )
 def test_magnet_operating_state(
@@ -82,12 +220,32 @@ def test_magnet_operating_state(
             assert state == expected_state
 
 
+@pytest.mark.parametrize(
+    "state, expected",
+    [
+        (CryomagneticsOperatingState(holding=True), True),
+        (CryomagneticsOperatingState(standby=True), True),
+        (CryomagneticsOperatingState(ramping=True), False),
+        (CryomagneticsOperatingState(quench_condition_present=True), False),
+        (CryomagneticsOperatingState(power_module_failure=True), False),
+    ],
+)
+def test_can_start_ramping(state, expected):
+    assert state.can_start_ramping() is expected
+
+
+def test_operating_state_has_no_instance_dict():
+    state = CryomagneticsOperatingState()
+    assert not hasattr(state, "__dict__")
+    with pytest.raises(AttributeError):
+        state.not_a_field = True
+
 
 def test_set_field_successful(cryo_instrument, caplog):
     with (
         patch.object(cryo_instrument, "write") as mock_write,
         patch.object(cryo_instrument, "ask", return_value="2"),
-        patch.object(cryo_instrument, "_get_field", return_value=0),
+        patch.object(cryo_instrument, "_get_field_kg", return_value=0),
     ):
         with caplog.at_level(logging.WARNING):
             cryo_instrument.set_field(0.1, block=False)
@@ -103,7 +261,7 @@ def test_set_field_successful(cryo_instrument, caplog):
 def test_set_field_blocking(cryo_instrument):
     with (
         patch.object(cryo_instrument, "write") as mock_write,
-        patch.object(cryo_instrument, "_get_field", return_value=0),
+        patch.object(cryo_instrument, "_get_field_kg", return_value=0),
     ):
         # Create a mock for the ask method
         mock_ask = Mock(side_effect=lambda x: "0" if x == "*STB?" else "")
@@ -119,10 +277,42 @@ def test_set_field_blocking(cryo_instrument):
             for call in mock_write.call_args_list
             if "LLIM" in str(call) or "ULIM" in str(call) or "SWEEP" in str(call)
         ]
-        assert any("ULIM 5.0" in str(call) for call in calls)
+        assert call("ULIM 5") in calls
         assert any("SWEEP UP" in str(call) for call in calls)
 
 
+def test_set_field_compares_in_kg(cryo_instrument):
+    # 1 T is 10 kG, so ramping to 0.5 T (5 kG) must sweep down
+    with (
+        patch.object(cryo_instrument, "write") as mock_write,
+        patch.object(cryo_instrument, "ask", return_value="0"),
+        patch.object(cryo_instrument, "_get_field_kg", return_value=10.0),
+    ):
+        cryo_instrument.set_field(0.5, block=False)
+    assert call("LLIM 5") in mock_write.call_args_list
+    assert call("SWEEP DOWN") in mock_write.call_args_list
+
+
+def test_set_field_writes_short_limit(cryo_instrument):
+    # 0.3 * 10 is 3.0000000000000004 in floating point
+    with (
+        patch.object(cryo_instrument, "write") as mock_write,
+        patch.object(cryo_instrument, "ask", return_value="0"),
+        patch.object(cryo_instrument, "_get_field_kg", return_value=0.0),
+    ):
+        cryo_instrument.set_field(0.3, block=False)
+    assert call("ULIM 3") in mock_write.call_args_list
+
+
+def test_set_field_already_at_setpoint(cryo_instrument):
+    with (
+        patch.object(cryo_instrument, "write") as mock_write,
+        patch.object(cryo_instrument, "_get_field_kg", return_value=5.0),
+    ):
+        cryo_instrument.set_field(0.5)
+    mock_write.assert_not_called()
+
+
 def test_wait_while_ramping(cryo_instrument):
     # Create a mock for the ask method
     mock_ask = Mock(side_effect=lambda x: "0" if x == "*STB?" else "")
@@ -137,9 +327,72 @@ def test_wait_while_ramping(cryo_instrument):
     assert state.ramping is False
 
 
+def test_wait_while_ramping_backoff(cryo_instrument):
+    cryo_instrument.ramping_state_check_interval(1.0)
+    status_bytes = iter(["1"] * 6 + ["0", "0"])
+    mock_ask = Mock(side_effect=lambda x: next(status_bytes) if x == "*STB?" else "")
+    cryo_instrument.ask = mock_ask
+
+    with (
+        patch.object(cryo_instrument, "write"),
+        patch.object(cryo_instrument, "_sleep") as mock_sleep,
+    ):
+        cryo_instrument.wait_while_ramping(0.5)
+
+    # the final sleep is the fixed wait after pausing the sweep
+    intervals = [c.args[0] for c in mock_sleep.call_args_list[:-1]]
+    assert intervals == pytest.approx([1.0, 1.5, 2.25, 3.375, 5.0, 5.0])
+
+
+def test_sleep_skipped_in_sim_mode(cryo_instrument):
+    assert cryo_instrument._simmode is True
+    with patch("time.sleep") as mock_sleep:
+        cryo_instrument._sleep(10.0)
+    mock_sleep.assert_not_called()
+
+    cryo_instrument._simmode = False
+    with patch("time.sleep") as mock_sleep:
+        cryo_instrument._sleep(10.0)
+    mock_sleep.assert_called_once_with(10.0)
+
+
+def test_wait_while_ramping_interval_above_cap(cryo_instrument):
+    cryo_instrument.ramping_state_check_interval(10.0)
+    status_bytes = iter(["1"] * 3 + ["0", "0"])
+    mock_ask = Mock(side_effect=lambda x: next(status_bytes) if x == "*STB?" else "")
+    cryo_instrument.ask = mock_ask
+
+    with (
+        patch.object(cryo_instrument, "write"),
+        patch.object(cryo_instrument, "_sleep") as mock_sleep,
+    ):
+        cryo_instrument.wait_while_ramping(0.5)
+
+    # an interval above the cap is never shortened
+    intervals = [c.args[0] for c in mock_sleep.call_args_list[:-1]]
+    assert intervals == pytest.approx([10.0, 10.0, 10.0])
+
+
+def test_wait_while_ramping_zero_interval_backs_off(cryo_instrument):
+    cryo_instrument.ramping_state_check_interval(0)
+    status_bytes = iter(["1"] * 3 + ["0", "0"])
+    mock_ask = Mock(side_effect=lambda x: next(status_bytes) if x == "*STB?" else "")
+    cryo_instrument.ask = mock_ask
+
+    with (
+        patch.object(cryo_instrument, "write"),
+        patch.object(cryo_instrument, "_sleep") as mock_sleep,
+    ):
+        cryo_instrument.wait_while_ramping(0.5)
+
+    floor = cryo_instrument._MIN_RAMPING_STATE_CHECK_INTERVAL
+    intervals = [c.args[0] for c in mock_sleep.call_args_list[:-1]]
+    assert intervals == pytest.approx([floor, floor * 1.5, floor * 2.25])
+
+
 def test_get_rate(cryo_instrument):
     with patch.object(cryo_instrument, "ask", return_value="5.0"):
-        assert cryo_instrument._get_rate() == 5.0 * 60 / cryo_instrument.coil_constant
+        assert cryo_instrument._get_rate() == 5.0 * cryo_instrument.coil_constant * 60
 
 
 def test_set_rate(cryo_instrument):
@@ -151,27 +404,177 @@ def test_set_rate(cryo_instrument):
 
     with (
         patch.object(cryo_instrument, "write") as mock_write,
-        patch.object(cryo_instrument, "_get_field", return_value=0.5),
+        patch.object(cryo_instrument, "_get_field_kg", return_value=5.0),
     ):
         cryo_instrument._set_rate(1.0)
         expected_rate = min(
-            1.0 * cryo_instrument.coil_constant / 60,
+            1.0 / cryo_instrument.coil_constant / 60,
             cryo_instrument.max_current_limits[0][1],
         )
-        assert mock_write.call_args_list == [call(f"RATE 0 {expected_rate}")]
+        assert mock_write.call_args_list == [call(f"RATE 0 {expected_rate:.6g}")]
+
+
+@pytest.mark.parametrize(
+    "field_kg, expected_call",
+    [
+        (5.0, call("RATE 0 0.5")),
+        (10.0, call("RATE 0 0.5")),
+        (20.0, call("RATE 1 2")),
+        (-5.0, call("RATE 0 0.5")),
+        (-20.0, call("RATE 1 2")),
+    ],
+)
+def test_set_rate_selects_range(cryo_instrument, field_kg, expected_call):
+    cryo_instrument.coil_constant = 0.1  # 1 T is 10 A
+    # ranges are deliberately given out of order
+    cryo_instrument.max_current_limits = {
+        1: (50.0, 2.0),
+        0: (10.0, 0.5),
+    }
+
+    with (
+        patch.object(cryo_instrument, "write") as mock_write,
+        patch.object(cryo_instrument, "_get_field_kg", return_value=field_kg),
+    ):
+        cryo_instrument._set_rate(60.0)
+        assert mock_write.call_args_list == [expected_call]
+
+
+def test_set_rate_out_of_range(cryo_instrument):
+    cryo_instrument.coil_constant = 0.1  # 1 T is 10 A
+    cryo_instrument.max_current_limits = {0: (10.0, 1.0)}
+
+    with (
+        patch.object(cryo_instrument, "write") as mock_write,
+        patch.object(cryo_instrument, "_get_field_kg", return_value=50.0),
+        pytest.raises(
+            ValueError,
+            match=r"outside of defined rate ranges: .* upper limits \(10\.0A\)",
+        ),
+    ):
+        cryo_instrument._set_rate(1.0)
+    mock_write.assert_not_called()
+
+
+def test_max_current_limits_read_only(cryo_instrument):
+    limits = {0: (10.0, 1.0)}
+    cryo_instrument.max_current_limits = limits
+    with pytest.raises(TypeError):
+        cryo_instrument.max_current_limits[1] = (50.0, 2.0)
+
+    # changes to the dict that was assigned do not leak into the driver
+    limits[1] = (50.0, 2.0)
+    assert dict(cryo_instrument.max_current_limits) == {0: (10.0, 1.0)}
+
+    cryo_instrument.max_current_limits = limits
+    assert cryo_instrument._upper_current_limits == [10.0, 50.0]
+
+
+def test_max_current_limits_assignment_configures_instrument(cryo_instrument):
+    with patch.object(cryo_instrument, "write") as mock_write:
+        cryo_instrument.max_current_limits = {0: (10.0, 1.0), 1: (50.0, 2.0)}
+    assert mock_write.call_args_list == [
+        call("RANGE 0 10;RATE 0 1;RANGE 1 50;RATE 1 2")
+    ]
+
+
+def test_set_rate_reuses_recent_field_reading(cryo_instrument):
+    cryo_instrument.max_current_limits = {0: (10.0, 1.0)}
+
+    with patch.object(cryo_instrument, "ask", return_value="5.0 kG") as mock_ask:
+        cryo_instrument._get_field_kg()
+        with patch.object(cryo_instrument, "write") as mock_write:
+            cryo_instrument._set_rate(1.0)
+        assert mock_ask.call_args_list == [call("IMAG?")]
+        assert mock_write.call_count == 1
+
+        # once the reading has expired the field is queried again
+        expired = time.monotonic() + cryo_instrument._FIELD_CACHE_LIFETIME
+        with (
+            patch.object(cryo_instrument, "write"),
+            patch("time.monotonic", return_value=expired),
+        ):
+            cryo_instrument._set_rate(1.0)
+        assert mock_ask.call_args_list == [call("IMAG?"), call("IMAG?")]
+
+
+def test_set_field_invalidates_field_reading(cryo_instrument):
+    cryo_instrument._last_field_kg = (0.0, time.monotonic())
+    with (
+        patch.object(cryo_instrument, "write"),
+        patch.object(cryo_instrument, "ask", return_value="0"),
+        patch.object(cryo_instrument, "_get_field_kg", return_value=0.0),
+    ):
+        cryo_instrument.set_field(0.5, block=False)
+    assert cryo_instrument._last_field_kg is None
+
+
+@pytest.mark.parametrize("method_name", ["zero_current", "reset"])
+def test_sweep_start_invalidates_field_reading(cryo_instrument, method_name):
+    cryo_instrument._last_field_kg = (0.0, time.monotonic())
+    with patch.object(cryo_instrument, "write"):
+        getattr(cryo_instrument, method_name)()
+    assert cryo_instrument._last_field_kg is None
 
 
 def test_initialize_max_current_limits(cryo_instrument):
+    cryo_instrument.max_current_limits = {
+        0: (10.0, 1.0),
+        1: (50.0, 2.0),
+    }
     with patch.object(cryo_instrument, "write") as mock_write:
         cryo_instrument._initialize_max_current_limits()
-        calls = [
-            call(f"RANGE {range_index} {upper_limit}")
-            for range_index, (
-                upper_limit,
-                _,
-            ) in cryo_instrument.max_current_limits.items()
-        ] + [
-            call(f"RATE {range_index} {max_rate}")
-            for range_index, (_, max_rate) in cryo_instrument.max_current_limits.items()
+        assert mock_write.call_args_list == [
+            call("RANGE 0 10;RATE 0 1;RANGE 1 50;RATE 1 2")
         ]
-        assert mock_write.call_args_list == calls
+
+
+def test_initialize_max_current_limits_empty(cryo_instrument):
+    cryo_instrument.max_current_limits = {}
+    with patch.object(cryo_instrument, "write") as mock_write:
+        cryo_instrument._initialize_max_current_limits()
+        mock_write.assert_not_called()
+
+
+def test_ask_retries_with_backoff(cryo_instrument):
+    error = VisaIOError(StatusCode.error_timeout)
+    with (
+        patch.object(
+            VisaInstrument, "ask_raw", side_effect=[error, error, "5.0"]
+        ) as mock_ask_raw,
+        patch.object(cryo_instrument, "device_clear") as mock_clear,
+        patch("time.sleep") as mock_sleep,
+    ):
+        assert cryo_instrument.ask_raw("RATE?") == "5.0"
+    assert mock_ask_raw.call_count == 3
+    assert mock_clear.call_count == 2
+    assert mock_sleep.call_args_list == [call(0.05), call(0.2)]
+
+
+def test_write_raises_after_retries_exhausted(cryo_instrument):
+    error = VisaIOError(StatusCode.error_timeout)
+    n_attempts = len(cryo_instrument._RETRY_DELAYS) + 1
+    with (
+        patch.object(VisaInstrument, "write_raw", side_effect=error) as mock_write,
+        patch.object(cryo_instrument, "device_clear"),
+        patch("time.sleep") as mock_sleep,
+        pytest.raises(VisaIOError),
+    ):
+        cryo_instrument.write_raw("SWEEP UP")
+    assert mock_write.call_count == n_attempts
+    assert mock_sleep.call_args_list == [
+        call(delay) for delay in cryo_instrument._RETRY_DELAYS
+    ]
+
+
+def test_no_retry_when_disabled(cryo_instrument):
+    error = VisaIOError(StatusCode.error_timeout)
+    cryo_instrument._RETRY_WRITE_ASK = False
+    with (
+        patch.object(VisaInstrument, "ask_raw", side_effect=error) as mock_ask_raw,
+        patch("time.sleep") as mock_sleep,
+        pytest.raises(VisaIOError),
+    ):
+        cryo_instrument.ask_raw("RATE?")
+    assert mock_ask_raw.call_count == 1
+    mock_sleep.assert_not_called()